@@ -17,7 +17,8 @@ import matplotlib.pyplot as plt # Plots
 import pydst # Statistics Denmark (DST)
 from datetime import datetime # Formating dates
 import ipywidgets as widgets # interactive plots
-from IPython.display import display # display multiple outputs from a single cell
+from IPython.display import display, HTML # display multiple outputs from a single cell
+from dataproject.instrument import stage, is_enabled # stage timings, switched on by the INSTRUMENT environment variable
 
 #%% [markdown]
 # ## 1. Importing and cleaning data
@@ -27,13 +28,17 @@ Dst = pydst.Dst(lang='en') # Set language to English
 
 
 #%%
-Dst.get_subjects() # Get overview of Statistics Denmark's subjects
+with stage('get_subjects'):
+    Subjects = Dst.get_subjects()
+Subjects # Get overview of Statistics Denmark's subjects
 
 #%% [markdown]
 # In our future analysis we drill down into Denmark's current account which is found in Statistics Denmark's table 'BB1S'. 
 
 #%%
-Var = Dst.get_variables(table_id = 'BB1S')
+with stage('get_variables') as s:
+    Var = Dst.get_variables(table_id = 'BB1S')
+    s['rows'] = len(Var)
 
 #%% [markdown]
 # Before going into a deeper analysis, we would like to get an overview of the data.
@@ -54,8 +59,10 @@ Var0
 # First we choose to look at the following dataframe, df1.
 
 #%%
-df1= Dst.get_data(table_id = 'BB1S', variables={'TID':['*'], 
-                                               'SÆSON':['2'], 'LAND':['*'], 'POST':['*'], 'INDUDBOP':['N']})
+with stage('get_data all countries') as s:
+    df1= Dst.get_data(table_id = 'BB1S', variables={'TID':['*'], 
+                                                   'SÆSON':['2'], 'LAND':['*'], 'POST':['*'], 'INDUDBOP':['N']})
+    s['rows'] = len(df1)
 df1.head(5)
 
 #%% [markdown]
@@ -74,9 +81,13 @@ def colourmap(x):
     else:
         color = 'black'
     return r'color: %s' % color
-df1.sort_values(['TID'], inplace=True)
-Descriptive = df1.groupby(['POST','LAND']).describe().style.applymap(colourmap)
-Descriptive
+with stage('sort all countries', rows=len(df1)):
+    df1.sort_values(['TID'], inplace=True)
+with stage('describe', rows=len(df1)):
+    Descriptive = df1.groupby(['POST','LAND']).describe().style.applymap(colourmap)
+with stage('styler render', rows=len(df1)):
+    Descriptive_html = Descriptive.to_html()
+display(HTML(Descriptive_html))
 
 #%% [markdown]
 # We notice that the current account is overall positive, but negative within the EU-28. Specifically, Denmark has a deficit in regards to services, primary and secondary income when trading with the other EU member states (EU-28). Vi skal lige soge hvor datasættet starter og slutter.
@@ -84,18 +95,22 @@ Descriptive
 # Moving on, we are only interested in the current account to the whole world (REST OF THE WORLD). Therefore, we specify 'Land'='W1'.
 
 #%%
-df= Dst.get_data(table_id = 'BB1S', variables={'TID':['*'], 
-                                               'SÆSON':['2'], 'LAND':['W1'], 'POST':['*'], 'INDUDBOP':['N']})
-df.sort_values(['TID'], inplace=True)
+with stage('get_data W1') as s:
+    df= Dst.get_data(table_id = 'BB1S', variables={'TID':['*'], 
+                                                   'SÆSON':['2'], 'LAND':['W1'], 'POST':['*'], 'INDUDBOP':['N']})
+    s['rows'] = len(df)
+with stage('sort W1', rows=len(df)):
+    df.sort_values(['TID'], inplace=True)
 df.head(5)
 
 #%% [markdown]
 # The dataframe looks nice, but in order to plot the accounts, we need to format our time column accordingly. Further, "REST OF THE WORLD" does not seem to be an appropriate name for the whole world. Therefore, we change the name to "Whole world".
 
 #%%
-df['LAND'] = df['LAND'].str.replace('REST OF THE WORLD', 'Whole world')
-df['TID'] = df['TID'].str.replace('M', '-')
-df['TID'] = pd.to_datetime(df['TID'])
+with stage('clean', rows=len(df)):
+    df['LAND'] = df['LAND'].str.replace('REST OF THE WORLD', 'Whole world')
+    df['TID'] = df['TID'].str.replace('M', '-')
+    df['TID'] = pd.to_datetime(df['TID'])
 display(df.head(5))
 display(df.tail(5))
 
@@ -121,45 +136,48 @@ display(Variables.style.hide_index())
 # $$CA = PI + S + SI + G$$
 
 #%%
-plt.style.use('seaborn')
-fig, axs = plt.subplots(3,2,figsize=(15,10))
-plt.subplots_adjust(left=None, bottom=None, right=None, top=None, wspace=0.2, hspace=0.4)
+with stage('plot accounts', rows=len(df)):
+    plt.style.use('seaborn')
+    fig, axs = plt.subplots(3,2,figsize=(15,10))
+    plt.subplots_adjust(left=None, bottom=None, right=None, top=None, wspace=0.2, hspace=0.4)
 
 
 
-plt.subplot(3, 2, 1)
-plt.plot(PI['TID'],PI['INDHOLD'])
-plt.xlabel('Time')
-plt.ylabel('Primary Income')
-plt.title('Primary Income')
+    plt.subplot(3, 2, 1)
+    plt.plot(PI['TID'],PI['INDHOLD'])
+    plt.xlabel('Time')
+    plt.ylabel('Primary Income')
+    plt.title('Primary Income')
 
-plt.subplot(3, 2, 2)
-plt.plot(S['TID'],S['INDHOLD'])
-plt.xlabel('Time')
-plt.ylabel('Services')
-plt.title('Services')
+    plt.subplot(3, 2, 2)
+    plt.plot(S['TID'],S['INDHOLD'])
+    plt.xlabel('Time')
+    plt.ylabel('Services')
+    plt.title('Services')
 
-plt.subplot(3, 2, 3)
-plt.plot(SI['TID'],SI['INDHOLD'])
-plt.xlabel('Time')
-plt.ylabel('Secondary Income')
-plt.title('Secondary Income')
+    plt.subplot(3, 2, 3)
+    plt.plot(SI['TID'],SI['INDHOLD'])
+    plt.xlabel('Time')
+    plt.ylabel('Secondary Income')
+    plt.title('Secondary Income')
 
-plt.subplot(3, 2, 4)
-plt.plot(G['TID'],G['INDHOLD'])
-plt.xlabel('Time')
-plt.ylabel('Goods (FOB)')
-plt.title('Goods (FOB)')
+    plt.subplot(3, 2, 4)
+    plt.plot(G['TID'],G['INDHOLD'])
+    plt.xlabel('Time')
+    plt.ylabel('Goods (FOB)')
+    plt.title('Goods (FOB)')
 
 
-plt.subplot(3, 1, 3)
-plt.plot(CA['TID'],CA['INDHOLD'])
-plt.xlabel('Time')
-plt.ylabel('Current Account')
-plt.title('Current Account')
+    plt.subplot(3, 1, 3)
+    plt.plot(CA['TID'],CA['INDHOLD'])
+    plt.xlabel('Time')
+    plt.ylabel('Current Account')
+    plt.title('Current Account')
 
 
 
+    if is_enabled():
+        fig.canvas.draw() # time the drawing here, plt.show may block on the window
 plt.show('Historical plot')
 
 #%% [markdown]
@@ -304,7 +322,8 @@ widgets.interactive(myplot_1, services=True, secondary_income=True, goods=True,
 
 #%%
 import itertools as it
-ACC_CA = pd.DataFrame(list(it.accumulate(CA['INDHOLD'])))
+with stage('accumulate', rows=len(CA)):
+    ACC_CA = pd.DataFrame(list(it.accumulate(CA['INDHOLD'])))
 ACC_CA.columns = ['Accumulated_CA']
 ACC_CA.head(5)
 
@@ -323,10 +342,13 @@ ca_index.head()
 # We are now able to plot the accumulated current account since 2005.
 
 #%%
-sns.lineplot(ca_index['TID'],ca_index['ACC_CA'])
-plt.xlabel('Time')
-plt.ylabel('Billion DKK')
-plt.title('Accumulated current account since 2005')
+with stage('plot accumulated', rows=len(ca_index)):
+    sns.lineplot(ca_index['TID'],ca_index['ACC_CA'])
+    plt.xlabel('Time')
+    plt.ylabel('Billion DKK')
+    plt.title('Accumulated current account since 2005')
+    if is_enabled():
+        plt.gcf().canvas.draw()
 plt.show()
 
 #%% [markdown]
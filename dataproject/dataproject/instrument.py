@@ -0,0 +1,187 @@
+# Stage-level timing and memory instrumentation.
+#
+# Switched off by default. Turn it on without touching the scripts by setting
+# the INSTRUMENT environment variable to the trace file, e.g.
+#   INSTRUMENT=trace.json python "Data Analysis Project.py"
+# 'Model Project.py' imports this module from the dataproject folder as well.
+# The trace is written as JSON or CSV (by extension) when the process exits.
+#
+# Allocation peaks need tracemalloc, which slows down every allocation and so
+# inflates the timings. It is only switched on with INSTRUMENT_MEM=1; take the
+# timings from a run without it.
+#
+# Wrap a pipeline stage with the context manager or the decorator:
+#   with stage('fetch') as s:
+#       df = Dst.get_data(...)
+#       s['rows'] = len(df)
+#
+#   @timed('clean')
+#   def clean(df): ...
+
+import atexit
+import csv
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource # Peak RSS, not available on Windows
+except ImportError:
+    resource = None
+
+FIELDS = ['stage', 'wall_s', 'cpu_s', 'peak_alloc_bytes', 'peak_rss_growth_kb', 'rows']
+
+records = [] # One dict per finished stage
+_enabled = False
+_path = None
+_stack = [] # Open stages, used to carry allocation peaks to the parent
+
+
+def enable(path=None, memory=False):
+    '''
+    Start recording, optionally dumping the trace to path at exit
+    memory=True also traces allocations, at a large cost to the timings
+    '''
+    global _enabled, _path
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if path and _path is None:
+        atexit.register(dump)
+    _path = path or _path
+    _enabled = True
+
+
+def disable():
+    '''
+    Stop recording, the records collected so far are kept
+    '''
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+def _max_rss_kb():
+    # Peak RSS of the process so far, ru_maxrss is in bytes on macOS
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return rss
+
+
+class _Stage:
+    def __init__(self, name, rows):
+        self.record = {'stage': name, 'rows': rows}
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            self.start_alloc, peak = tracemalloc.get_traced_memory()
+            # Keep the peak reached so far for the parent before resetting it
+            if _stack:
+                _stack[-1].child_peak = max(_stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+        _stack.append(self)
+        self.rss = _max_rss_kb()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = _max_rss_kb()
+        _stack.pop()
+        peak_alloc = None
+        if self.tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.child_peak)
+            if _stack:
+                _stack[-1].child_peak = max(_stack[-1].child_peak, peak)
+            peak_alloc = peak - self.start_alloc
+        # How much the stage raised the process peak RSS, 0 if it stayed below an earlier peak
+        self.record.update(wall_s=wall, cpu_s=cpu, peak_alloc_bytes=peak_alloc,
+                           peak_rss_growth_kb=rss - self.rss if rss is not None else None)
+        records.append(self.record)
+        return False
+
+
+class _Off:
+    # Shared no-op stage used while instrumentation is switched off
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_OFF = _Off()
+
+
+def stage(name, rows=None):
+    '''
+    Context manager recording wall time, CPU time and memory of a stage
+    Set 'rows' on the yielded dict to record a row count
+    '''
+    if not _enabled:
+        return _OFF
+    return _Stage(name, rows)
+
+
+def timed(name=None):
+    '''
+    Decorator version of stage, the row count is taken from the return value
+    '''
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(label, None) as record:
+                result = func(*args, **kwargs)
+                if hasattr(result, '__len__'):
+                    record['rows'] = len(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def collect():
+    '''
+    Return and clear the records, used to hand them back from worker processes
+    '''
+    collected = list(records)
+    del records[:]
+    return collected
+
+
+def dump(path=None):
+    '''
+    Write the records to a JSON or CSV file, depending on the extension
+    '''
+    path = path or _path
+    if not path or not records:
+        return
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            json.dump(records, f, indent=2)
+
+
+if os.environ.get('INSTRUMENT'):
+    enable(os.environ['INSTRUMENT'], memory=os.environ.get('INSTRUMENT_MEM') == '1')
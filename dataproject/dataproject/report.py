@@ -0,0 +1,231 @@
+# Headless version of 'Data Analysis Project.py'. Runs the fetch -> clean ->
+# describe -> plot -> accumulate steps without a notebook and renders one report
+# per country (LAND) in parallel.
+#
+# Usage (from the dataproject folder):
+#   python -m dataproject.report --out reports
+#   python -m dataproject.report --land W1 B6 --workers 2
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg') # No display needed, render straight to files
+import matplotlib.pyplot as plt # Plots
+import pandas as pd # Data structure and analysis package
+import seaborn as sns # Additional graphs and layout
+import pydst # Statistics Denmark (DST)
+
+from dataproject import instrument
+from dataproject.instrument import stage, timed
+
+TABLE_ID = 'BB1S'
+
+# Accounts in the current account identity CA = PI + S + SI + G
+ACCOUNTS = [('PRIMARY INCOME', 'Primary Income', 'r'),
+            ('SERVICES', 'Services', 'b'),
+            ('SECONDARY INCOME', 'Secondary Income', 'g'),
+            ('GOODS (FOB)', 'Goods (FOB)', 'y')]
+CURRENT_ACCOUNT = 'CURRENT ACCOUNT'
+
+
+def get_countries(Dst):
+    '''
+    Map LAND codes to the names used in table BB1S
+    '''
+    Var = Dst.get_variables(table_id=TABLE_ID)
+    values = Var.loc[Var['id'] == 'LAND', 'values'].iloc[0]
+    return {v['id']: v['text'] for v in values}
+
+
+@timed('fetch')
+def fetch(Dst, lands):
+    '''
+    Fetch the current account for the given LAND codes in a single request
+    Use ['*'] for all countries
+    '''
+    return Dst.get_data(table_id=TABLE_ID, variables={'TID': ['*'],
+                        'SÆSON': ['2'], 'LAND': list(lands), 'POST': ['*'], 'INDUDBOP': ['N']})
+
+
+@timed('clean')
+def clean(df):
+    '''
+    Sort by time, format the time column and rename the whole world
+    '''
+    df = df.copy()
+    df['LAND'] = df['LAND'].str.replace('REST OF THE WORLD', 'Whole world')
+    df['TID'] = pd.to_datetime(df['TID'].str.replace('M', '-'))
+    return df.sort_values(['TID']).reset_index(drop=True)
+
+
+def colourmap(x):
+    '''
+    Colour negative values red
+    Black otherwise
+    '''
+    if x < 0:
+        color = 'red'
+    else:
+        color = 'black'
+    return r'color: %s' % color
+
+
+def describe(df):
+    '''
+    Descriptive statistics per account as HTML, negative values in red
+    '''
+    return df.groupby('POST')['INDHOLD'].describe().style.map(colourmap).to_html()
+
+
+def accumulate(CA):
+    '''
+    Accumulated current account with the matching dates
+    '''
+    ca_index = pd.DataFrame()
+    ca_index['TID'] = list(CA['TID'])
+    ca_index['ACC_CA'] = list(CA['INDHOLD'].cumsum())
+    return ca_index
+
+
+def plot_accounts(df):
+    '''
+    One panel per account and the current account at the bottom
+    '''
+    fig = plt.figure(figsize=(15, 10))
+    fig.subplots_adjust(wspace=0.2, hspace=0.4)
+    for i, (post, title, _) in enumerate(ACCOUNTS):
+        account = df.loc[df['POST'] == post, :]
+        ax = fig.add_subplot(3, 2, i + 1)
+        ax.plot(account['TID'], account['INDHOLD'])
+        ax.set_xlabel('Time')
+        ax.set_ylabel(title)
+        ax.set_title(title)
+    CA = df.loc[df['POST'] == CURRENT_ACCOUNT, :]
+    ax = fig.add_subplot(3, 1, 3)
+    ax.plot(CA['TID'], CA['INDHOLD'])
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Current Account')
+    ax.set_title('Current Account')
+    return fig
+
+
+def plot_compared(df):
+    '''
+    All accounts in one graph, the non-interactive version of myplot_1
+    '''
+    fig, ax = plt.subplots()
+    CA = df.loc[df['POST'] == CURRENT_ACCOUNT, :]
+    ax.plot(CA['TID'], CA['INDHOLD'], 'black', label='Current account')
+    for post, title, colour in ACCOUNTS:
+        account = df.loc[df['POST'] == post, :]
+        ax.plot(account['TID'], account['INDHOLD'], colour, label=title)
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Billion DKK')
+    ax.set_title('Accounts compared to current account')
+    ax.legend()
+    return fig
+
+
+def plot_accumulated(ca_index):
+    '''
+    Accumulated current account over the whole period
+    '''
+    fig, ax = plt.subplots()
+    sns.lineplot(x=ca_index['TID'], y=ca_index['ACC_CA'], ax=ax)
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Billion DKK')
+    ax.set_title('Accumulated current account since {}'.format(ca_index['TID'].min().year))
+    return fig
+
+
+def render_report(land, df, out):
+    '''
+    Write the PNG/HTML/CSV artifacts for one country to out/land
+    Runs in a worker process, so everything it needs is passed in
+    '''
+    sns.set()
+    folder = os.path.join(out, re.sub(r'[^\w-]', '_', land))
+    os.makedirs(folder, exist_ok=True)
+
+    df.to_csv(os.path.join(folder, 'data.csv'), index=False)
+    with stage('describe ' + land, rows=len(df)):
+        html = describe(df)
+    with open(os.path.join(folder, 'descriptive.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    with stage('accumulate ' + land) as s:
+        ca_index = accumulate(df.loc[df['POST'] == CURRENT_ACCOUNT, :])
+        s['rows'] = len(ca_index)
+    ca_index.to_csv(os.path.join(folder, 'accumulated_ca.csv'), index=False)
+
+    with stage('plot ' + land, rows=len(df)):
+        figures = [('accounts.png', plot_accounts(df)),
+                   ('compared.png', plot_compared(df)),
+                   ('accumulated_ca.png', plot_accumulated(ca_index))]
+        for name, fig in figures:
+            fig.savefig(os.path.join(folder, name))
+            plt.close(fig) # Workers render many reports, free the memory
+    return folder
+
+
+def _render_instrumented(land, df, out):
+    # atexit does not run in pool workers, so hand the records back to the parent.
+    # Forked workers start with a copy of the parent's records, drop those first
+    instrument.collect()
+    return render_report(land, df, out), instrument.collect()
+
+
+def run(lands=None, out='reports', workers=None):
+    '''
+    Fetch and clean the data once, then render the reports over a process pool
+    '''
+    Dst = pydst.Dst(lang='en') # Set language to English
+    countries = get_countries(Dst)
+    if lands is None:
+        df = clean(fetch(Dst, ['*']))
+    else:
+        unknown = [land for land in lands if land not in countries]
+        if unknown:
+            raise ValueError('Unknown LAND codes: {}'.format(', '.join(unknown)))
+        df = clean(fetch(Dst, lands))
+
+    # get_data returns the country names, so group on those and label by code
+    names = {name.replace('REST OF THE WORLD', 'Whole world'): land for land, name in countries.items()}
+    groups = [(names.get(name, name), frame) for name, frame in df.groupby('LAND')]
+
+    with stage('render', rows=len(groups)), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_instrumented, land, frame, out) for land, frame in groups]
+        folders = []
+        for future in futures:
+            folder, records = future.result()
+            folders.append(folder)
+            instrument.records.extend(records)
+    return folders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the current account report for each country in ' + TABLE_ID)
+    parser.add_argument('--land', nargs='+', help='LAND codes to report on (default: all)')
+    parser.add_argument('--out', default='reports', help='output folder (default: reports)')
+    parser.add_argument('--workers', type=int, help='number of processes (default: all cores)')
+    parser.add_argument('--trace', help='write stage timings to this JSON/CSV file')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also trace allocation peaks, this slows down the timed stages')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        # Picked up by spawned workers
+        os.environ['INSTRUMENT'] = args.trace
+        if args.trace_memory:
+            os.environ['INSTRUMENT_MEM'] = '1'
+        instrument.enable(args.trace, memory=args.trace_memory)
+
+    for folder in run(args.land, args.out, args.workers):
+        print(folder)
+
+
+if __name__ == '__main__':
+    main()
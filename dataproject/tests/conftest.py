@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the dataproject package importable when pytest is run from anywhere
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
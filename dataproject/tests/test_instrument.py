@@ -0,0 +1,98 @@
+import csv
+import json
+
+import pytest
+
+from dataproject import instrument
+from dataproject.instrument import stage, timed
+
+
+@pytest.fixture
+def on():
+    instrument.collect()
+    instrument.enable(memory=True)
+    yield
+    instrument.disable()
+    instrument.collect()
+
+
+def test_stage_off_is_shared_noop():
+    assert not instrument.is_enabled()
+    assert stage('a') is stage('b') is instrument._OFF
+    with stage('a') as s:
+        s['rows'] = 1
+    assert instrument.records == []
+
+
+def test_timed_off_calls_through():
+    @timed()
+    def f():
+        return [1, 2]
+    assert f() == [1, 2]
+    assert instrument.records == []
+
+
+def test_timed_records_rows(on):
+    @timed('f')
+    def f():
+        return [1, 2, 3]
+    f()
+    record, = instrument.records
+    assert record['stage'] == 'f'
+    assert record['rows'] == 3
+    assert record['wall_s'] >= 0 and record['cpu_s'] >= 0
+
+
+def test_nested_peak_reaches_parent(on):
+    with stage('outer', rows=2):
+        with stage('inner'):
+            big = bytearray(10 ** 6)
+            del big
+    inner, outer = instrument.records
+    assert (inner['stage'], outer['stage']) == ('inner', 'outer')
+    assert inner['peak_alloc_bytes'] >= 10 ** 6
+    # The inner peak was reset away, the outer stage must still see it
+    assert outer['peak_alloc_bytes'] >= inner['peak_alloc_bytes']
+    assert outer['rows'] == 2
+
+
+def test_no_allocation_tracing_by_default():
+    instrument.enable()
+    try:
+        with stage('a'):
+            pass
+    finally:
+        instrument.disable()
+    record, = instrument.collect()
+    assert record['peak_alloc_bytes'] is None
+
+
+def test_collect_clears(on):
+    with stage('a'):
+        pass
+    assert [record['stage'] for record in instrument.collect()] == ['a']
+    assert instrument.records == []
+
+
+def test_dump_json(on, tmp_path):
+    with stage('a', rows=1):
+        pass
+    path = str(tmp_path / 'trace.json')
+    instrument.dump(path)
+    with open(path) as f:
+        record, = json.load(f)
+    assert record['stage'] == 'a'
+    assert set(record) == set(instrument.FIELDS)
+
+
+def test_dump_csv(on, tmp_path):
+    with stage('a', rows=1):
+        pass
+    with stage('b'):
+        pass
+    path = str(tmp_path / 'trace.csv')
+    instrument.dump(path)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['stage'] for row in rows] == ['a', 'b']
+    assert [row['rows'] for row in rows] == ['1', '']
@@ -0,0 +1,110 @@
+import os
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+# pydst is only needed for the API calls, which are stubbed below
+sys.modules.setdefault('pydst', types.ModuleType('pydst'))
+
+from dataproject import instrument, report
+
+COUNTRIES = {'W1': 'REST OF THE WORLD', 'B6': 'EU-28'}
+POSTS = [post for post, _, _ in report.ACCOUNTS] + [report.CURRENT_ACCOUNT]
+
+
+def bb1s():
+    '''
+    Small BB1S frame in the shape returned by Dst.get_data
+    '''
+    rows = []
+    for name in COUNTRIES.values():
+        for month in range(1, 4):
+            for i, post in enumerate(POSTS):
+                rows.append({'INDUDBOP': 'Net', 'POST': post, 'LAND': name, 'SÆSON': 'Seasonally adjusted',
+                             'TID': '2005M{:02d}'.format(4 - month), 'INDHOLD': float(i - 2) * month})
+    return pd.DataFrame(rows)
+
+
+class Dst:
+    queries = []
+
+    def __init__(self, lang):
+        pass
+
+    def get_variables(self, table_id):
+        values = [{'id': land, 'text': name} for land, name in COUNTRIES.items()]
+        return pd.DataFrame({'id': ['LAND'], 'values': [values]})
+
+    def get_data(self, table_id, variables):
+        Dst.queries.append(variables['LAND'])
+        df = bb1s()
+        if variables['LAND'] != ['*']:
+            df = df[df['LAND'].isin([COUNTRIES[land] for land in variables['LAND']])]
+        return df
+
+
+@pytest.fixture
+def dst(monkeypatch):
+    Dst.queries = []
+    monkeypatch.setattr(report.pydst, 'Dst', Dst, raising=False)
+    return Dst
+
+
+def test_clean():
+    df = report.clean(bb1s())
+    assert df['TID'].is_monotonic_increasing
+    assert df['TID'].min() == pd.Timestamp('2005-01-01')
+    assert set(df['LAND']) == {'Whole world', 'EU-28'}
+
+
+def test_accumulate():
+    df = report.clean(bb1s())
+    CA = df[(df['POST'] == report.CURRENT_ACCOUNT) & (df['LAND'] == 'EU-28')]
+    ca_index = report.accumulate(CA)
+    assert list(ca_index['ACC_CA']) == [6.0, 10.0, 12.0]
+    assert list(ca_index['TID']) == list(CA['TID'])
+
+
+def test_describe_colours_negative_values():
+    html = report.describe(report.clean(bb1s()))
+    assert 'color: red' in html
+    assert 'color: black' in html
+
+
+def test_render_report(tmp_path):
+    df = report.clean(bb1s())
+    folder = report.render_report('W1', df[df['LAND'] == 'Whole world'], str(tmp_path))
+    assert sorted(os.listdir(folder)) == ['accounts.png', 'accumulated_ca.csv', 'accumulated_ca.png',
+                                          'compared.png', 'data.csv', 'descriptive.html']
+
+
+def test_render_instrumented_hands_back_worker_records(tmp_path):
+    df = report.clean(bb1s())
+    instrument.enable()
+    try:
+        instrument.collect()
+        instrument.records.append({'stage': 'parent'})
+        _, records = report._render_instrumented('W1', df[df['LAND'] == 'Whole world'], str(tmp_path))
+    finally:
+        instrument.disable()
+        instrument.collect()
+    assert [record['stage'] for record in records] == ['describe W1', 'accumulate W1', 'plot W1']
+
+
+def test_run_all_countries(dst, tmp_path):
+    folders = report.run(out=str(tmp_path), workers=1)
+    assert dst.queries == [['*']]
+    assert sorted(os.path.basename(folder) for folder in folders) == ['B6', 'W1']
+
+
+def test_run_selected_countries(dst, tmp_path):
+    folders = report.run(['W1'], out=str(tmp_path), workers=1)
+    assert dst.queries == [['W1']]
+    assert [os.path.basename(folder) for folder in folders] == ['W1']
+
+
+def test_run_unknown_country(dst, tmp_path):
+    with pytest.raises(ValueError):
+        report.run(['XX'], out=str(tmp_path))
@@ -18,6 +18,11 @@ from scipy import optimize
 import sympy as sm
 from sympy import Max, Symbol, oo, Eq, solve
 import nashpy as nash
+import sys
+# Shared stage timings, switched on by the INSTRUMENT environment variable. The path is
+# built from this file, as the working directory depends on where the script is started
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataproject'))
+from dataproject.instrument import stage
 
 #%% [markdown]
 # In our project we consider the collusion game known from industrial organization/game theory courses. The firms compete over quantities i.e. ála Cournot.$^1$ We start by finding the profit in the Cournot case. After, we find each firms collusion profits and lastly we look at the optimal deviation from collusion and the profits that follows. In our model demand is charaterized by the inverse demand function: 
@@ -81,14 +86,15 @@ q2_try = []
 q1_BR = []
 pi1_BR = []
 
-for i in q2_vec:
-    q2 = i
-    q1_guess = 60      
-    objective_function = lambda q1: -pi11(q1)
-    res = optimize.minimize(objective_function, q1_guess, method='BFGS')
-    q2_try.append(i)
-    q1_BR.append(res.x[0])
-    pi1_BR.append(-res.fun)
+with stage('best response sweep', rows=N):
+    for i in q2_vec:
+        q2 = i
+        q1_guess = 60      
+        objective_function = lambda q1: -pi11(q1)
+        res = optimize.minimize(objective_function, q1_guess, method='BFGS')
+        q2_try.append(i)
+        q1_BR.append(res.x[0])
+        pi1_BR.append(-res.fun)
 res
 
 #%% [markdown]
@@ -140,12 +146,13 @@ plt.show()
 # We will now find the intersection i.e. the Nash equilibrium. While we are at it, we also compute the profits that follow.
 
 #%%
-for i in range(N):
-    if df['q2_exo'][i] == df['q1_BR'][i] and df['q1_BR'][i] > 0:
-        pi_cournot = df['pi1'][i] 
-        q_cournot = df['q1_BR'][i]
-    else:
-        pass
+with stage('equilibrium search', rows=N):
+    for i in range(N):
+        if df['q2_exo'][i] == df['q1_BR'][i] and df['q1_BR'][i] > 0:
+            pi_cournot = df['pi1'][i] 
+            q_cournot = df['q1_BR'][i]
+        else:
+            pass
 
 print(f'Profit cournot = {pi_cournot}')
 print(f'Quantity cournot = {q_cournot}')
@@ -165,7 +172,8 @@ def pi12(Q):
 
 #%%
 objective_function = lambda Q: -pi12(Q)
-res_col = optimize.minimize(objective_function, 20, method='BFGS')
+with stage('collusion optimize'):
+    res_col = optimize.minimize(objective_function, 20, method='BFGS')
 Q_col=round(res_col.x[0],1)
 pi_joint_col=-round(res_col.fun,1)
 
@@ -214,9 +222,11 @@ Payoff_M
 #%%
 p1_Payoff = np.array([[pi_indi_col,pi_no_col],[pi_dev,pi_cournot]])
 p2_Payoff = np.array([[pi_indi_col,pi_dev],[pi_no_col,pi_cournot]])
-rps = nash.Game(p1_Payoff, p2_Payoff)
-eqs = rps.support_enumeration()
-NE = list(eqs)
+with stage('nashpy support enumeration') as s:
+    rps = nash.Game(p1_Payoff, p2_Payoff)
+    eqs = rps.support_enumeration()
+    NE = list(eqs)
+    s['rows'] = len(NE)
 
 print(f'With probability {NE[0][0][0]} player 1 will play Collusion') 
 print(f'With probability {NE[0][0][1]} player 1 will play Cournot')
@@ -242,7 +252,8 @@ print(f'With probability {NE[0][1][1]} player 2 will play Cournot')
 
 #%%
 d = sm.symbols('d')
-delta = solve(Eq(1/(1-d) * pi_indi_col, pi_dev + d/(1-d) * pi_cournot),d)
+with stage('sympy solve delta'):
+    delta = solve(Eq(1/(1-d) * pi_indi_col, pi_dev + d/(1-d) * pi_cournot),d)
 print(f'delta = {round(delta[0],2)}')
 print(f'The firms will not deviate as long as delta is larger than or equal {round(delta[0],2)}')
 
@@ -264,6 +275,7 @@ from scipy import optimize
 import sympy as sm
 from sympy import Max, Symbol, oo, Eq, solve
 import nashpy as nash
+from dataproject.instrument import stage
 #Now we make one function which solves the whole game
 def combined_function(a,c,b): 
         N = 999
@@ -321,11 +333,11 @@ def combined_function(a,c,b):
 
 
 #%%
-outcome = (combined_function(55,50,1), 
-           combined_function(200,100,1), 
-           combined_function(300,100,1), 
-           combined_function(200,50,1), 
-           combined_function(250,10,1))
+outcome = []
+for a, c, b in [(55,50,1), (200,100,1), (300,100,1), (200,50,1), (250,10,1)]:
+    with stage('combined_function a={} c={} b={}'.format(a, c, b)):
+        outcome.append(combined_function(a,c,b))
+outcome = tuple(outcome)
 
 #%% [markdown]
 # We see that it is no coincidence that we ended up with delta value of 0.53 before. It is a general result of Industrial Organization that with linear demand and constant marginal cost, firms must value profit gained in the future at least 0.53 as much as profit gained today in order to sustain collusion. 